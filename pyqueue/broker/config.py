@@ -10,3 +10,24 @@ class BrokerConfig:
     host: str = "127.0.0.1"
     port: int = 5555
     data_dir: str = "./data"
+
+    # Upper bounds on how many queued PUSHes are coalesced into one fsync.
+    # Each message is two iovecs, so 512 keeps a batch within one pwritev.
+    batch_max_messages: int = 512
+    batch_max_bytes: int = 1024 * 1024
+
+    # Seconds between flushes of updated consumer offsets; a crash within this
+    # window causes redelivery of the affected messages, never loss
+    offset_flush_interval: float = 0.05
+
+    # Unsent reply bytes per connection before the broker waits for the
+    # client to catch up
+    write_buffer_high_water: int = 256 * 1024
+
+    # Bytes the message log grows by at a time, so batch syncs need not
+    # update the file size. Reserved up front, so keep it small on tmpfs.
+    preallocate_size: int = 64 * 1024 * 1024
+
+    # Requests per connection read ahead of their replies; once reached, the
+    # broker stops reading from a client that is not collecting its replies
+    max_pipelined_requests: int = 1024
@@ -1,9 +1,16 @@
 """Command handlers for the broker."""
 
 import logging
-from typing import Optional
-
-from .protocol import ParsedCommand, Command, format_ok, format_msg, format_empty, format_error
+from typing import List, Optional, Union
+
+from .protocol import (
+    ParsedCommand,
+    Command,
+    OK_BYTES,
+    EMPTY_BYTES,
+    format_msg_bytes,
+    format_error_bytes,
+)
 from ..storage.queue import PersistentQueue
 
 
@@ -16,29 +23,33 @@ class CommandHandler:
     def __init__(self, queue: PersistentQueue) -> None:
         self._queue = queue
 
-    def handle(self, cmd: ParsedCommand) -> str:
-        """Handle a parsed command and return the response string."""
+    def handle(self, cmd: ParsedCommand) -> List[bytes]:
+        """Handle a parsed command and return the response frames."""
         try:
             if cmd.cmd == Command.PUSH:
                 return self._handle_push(cmd.args[0])
             elif cmd.cmd == Command.PULL:
                 return self._handle_pull(cmd.args[0])
             else:
-                return format_error(f"Unknown command: {cmd.cmd}")
+                return format_error_bytes(f"Unknown command: {cmd.cmd}")
         except Exception as e:
             logger.exception("Error handling command")
-            return format_error(str(e))
+            return format_error_bytes(str(e))
+
+    def _handle_push(self, message: Union[str, bytes]) -> List[bytes]:
+        """Handle a PUSH command.
 
-    def _handle_push(self, message: str) -> str:
-        """Handle a PUSH command."""
-        self._queue.push(message)
-        logger.debug(f"Pushed message: {message[:50]}...")
-        return format_ok()
+        The broker batches PUSHes itself; this path stores the message as a
+        batch of one so it is synced before OK is returned, like any other.
+        """
+        self._queue.push_batch([message])
+        logger.debug(f"Pushed message: {message[:50]!r}...")
+        return [OK_BYTES]
 
-    def _handle_pull(self, consumer_id: str) -> str:
+    def _handle_pull(self, consumer_id: str) -> List[bytes]:
         """Handle a PULL command."""
-        message: Optional[str] = self._queue.pull(consumer_id)
+        message: Optional[bytes] = self._queue.pull(consumer_id)
         if message is None:
-            return format_empty()
-        logger.debug(f"Pulled message for {consumer_id}: {message[:50]}...")
-        return format_msg(message)
+            return [EMPTY_BYTES]
+        logger.debug(f"Pulled message for {consumer_id}: {message[:50]!r}...")
+        return format_msg_bytes(message)
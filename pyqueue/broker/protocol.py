@@ -1,7 +1,7 @@
 """TCP protocol parser and formatter for PyQueue."""
 
 from dataclasses import dataclass
-from typing import List
+from typing import List, Union
 
 
 class Command:
@@ -16,7 +16,7 @@ class ParsedCommand:
     """Represents a parsed command from a client."""
 
     cmd: str
-    args: List[str]
+    args: List[Union[str, bytes]]
 
 
 class ProtocolError(Exception):
@@ -25,46 +25,42 @@ class ProtocolError(Exception):
     pass
 
 
-def parse_command(line: str) -> ParsedCommand:
-    """Parse a command line from the client.
+def parse_command_bytes(line: bytes) -> ParsedCommand:
+    """Parse a raw command line (without its trailing newline) from the client.
 
-    Format:
-        PUSH <message>
-        PULL <consumer_id>
-
-    Everything after the command is treated as a single argument.
+    Dispatches on the command prefix without decoding or splitting the line,
+    so PUSH payloads are passed through as bytes. Consumer ids are decoded
+    because offsets are tracked by str. Commands are case-sensitive.
     """
-    line = line.strip()
+    if line.startswith(b"PUSH "):
+        payload = line[5:]
+        if payload:
+            return ParsedCommand(cmd=Command.PUSH, args=[payload])
+    elif line.startswith(b"PULL "):
+        consumer_id = line[5:]
+        if consumer_id:
+            return ParsedCommand(cmd=Command.PULL, args=[consumer_id.decode("utf-8")])
+
+    # Slow path: work out which error to report
     if not line:
         raise ProtocolError("Empty command")
-
-    parts = line.split(" ", 1)
-    cmd = parts[0].upper()
-
-    if cmd not in (Command.PUSH, Command.PULL):
-        raise ProtocolError(f"Unknown command: {parts[0]}")
-
-    if len(parts) < 2 or not parts[1]:
-        raise ProtocolError(f"{cmd} requires an argument")
-
-    return ParsedCommand(cmd=cmd, args=[parts[1]])
-
-
-def format_ok() -> str:
-    """Format an OK response."""
-    return "OK\n"
+    name = line.split(b" ", 1)[0].decode("utf-8", errors="replace")
+    if name in (Command.PUSH, Command.PULL):
+        raise ProtocolError(f"{name} requires an argument")
+    raise ProtocolError(f"Unknown command: {name}")
 
 
-def format_msg(message: str) -> str:
-    """Format a message response."""
-    return f"MSG {message}\n"
+# Pre-encoded responses for the broker's write path. Responses are returned
+# as lists of frames so payloads can be written without concatenation.
+OK_BYTES = b"OK\n"
+EMPTY_BYTES = b"EMPTY\n"
 
 
-def format_empty() -> str:
-    """Format an EMPTY response (no messages available)."""
-    return "EMPTY\n"
+def format_msg_bytes(message: bytes) -> List[bytes]:
+    """Format a message response as frames for ``StreamWriter.writelines``."""
+    return [b"MSG ", message, b"\n"]
 
 
-def format_error(reason: str) -> str:
-    """Format an error response."""
-    return f"ERR {reason}\n"
+def format_error_bytes(reason: str) -> List[bytes]:
+    """Format an error response as frames for ``StreamWriter.writelines``."""
+    return [b"ERR ", reason.encode("utf-8"), b"\n"]
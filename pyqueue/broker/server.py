@@ -3,11 +3,18 @@
 import asyncio
 import logging
 import signal
+import socket
 from concurrent.futures import ThreadPoolExecutor
-from typing import Optional
+from typing import List, Optional, Tuple
 
 from .config import BrokerConfig
-from .protocol import parse_command, format_error, ProtocolError
+from .protocol import (
+    Command,
+    parse_command_bytes,
+    OK_BYTES,
+    format_error_bytes,
+    ProtocolError,
+)
 from .handlers import CommandHandler
 from ..storage.queue import PersistentQueue
 
@@ -18,21 +25,43 @@ logger = logging.getLogger(__name__)
 class PyQueueServer:
     """Async TCP server for PyQueue.
 
-    Uses asyncio for handling multiple concurrent clients.
-    Storage operations are run in a thread pool to avoid blocking.
+    Uses asyncio for handling multiple concurrent clients. Commands are
+    handled inline on the event loop since PULLs only touch the in-memory
+    index and a mapped read; the blocking PUSH write and fsync run in a
+    single worker thread.
+
+    PUSHes are not written one at a time: they are queued and a single
+    background task flushes everything that accumulated while the previous
+    batch was on disk, so one fsync covers many messages.
     """
 
     def __init__(self, config: Optional[BrokerConfig] = None) -> None:
         self._config = config or BrokerConfig()
-        self._queue = PersistentQueue(self._config.data_dir)
+        self._queue = PersistentQueue(
+            self._config.data_dir, preallocate_size=self._config.preallocate_size
+        )
         self._handler = CommandHandler(self._queue)
         self._server: Optional[asyncio.AbstractServer] = None
-        self._executor = ThreadPoolExecutor(max_workers=4)
+        # Only the batch flusher uses this, and it writes one batch at a time
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        # Offset saves (and the occasional compaction fsync) get their own
+        # thread so they neither block the loop nor delay push batches
+        self._offsets_executor = ThreadPoolExecutor(max_workers=1)
         self._running = False
 
+        # PUSHes waiting for the next batched write, with their reply futures
+        self._pending: List[Tuple[bytes, asyncio.Future]] = []
+        self._pending_ready: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
     async def start(self) -> None:
         """Start the broker server."""
         self._running = True
+        self._pending_ready = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._flush_pushes()),
+            asyncio.create_task(self._flush_offsets()),
+        ]
         self._server = await asyncio.start_server(
             self._handle_client,
             self._config.host,
@@ -51,50 +80,94 @@ class PyQueueServer:
         if self._server:
             self._server.close()
             await self._server.wait_closed()
-        self._queue.close()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._resolve_pushes(
+            self._pending, format_error_bytes("Broker shutting down")
+        )
+        self._pending.clear()
+        # Let any write or offset save already running finish first
         self._executor.shutdown(wait=True)
+        self._offsets_executor.shutdown(wait=True)
+        self._queue.close()
         logger.info("PyQueue broker stopped")
 
     async def _handle_client(
         self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
     ) -> None:
-        """Handle a connected client."""
+        """Handle a connected client.
+
+        Requests are dispatched as they are read while a separate task writes
+        the replies in request order. A client that pipelines several PUSHes
+        gets them into the same batched write instead of paying one fsync
+        each. A PULL waits for the connection's earlier PUSHes to be written
+        so clients always see their own messages. At most
+        ``max_pipelined_requests`` replies are outstanding per connection;
+        beyond that the client is not read until its replies catch up.
+        """
         addr = writer.get_extra_info("peername")
         logger.info(f"Client connected: {addr}")
 
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        writer.transport.set_write_buffer_limits(
+            high=self._config.write_buffer_high_water
+        )
+        replies: asyncio.Queue = asyncio.Queue(
+            maxsize=self._config.max_pipelined_requests
+        )
+        replier = asyncio.create_task(self._write_replies(writer, replies))
+        last_push: Optional[asyncio.Future] = None
+
         try:
             while self._running:
                 line = await reader.readline()
                 if not line:
                     break  # Client disconnected
 
+                line = line.rstrip(b"\r\n")
+                if not line:
+                    continue
+
                 try:
-                    line_str = line.decode("utf-8").strip()
-                    if not line_str:
-                        continue
+                    logger.debug("Received from %s: %r", addr, line)
+                    cmd = parse_command_bytes(line)
 
-                    logger.debug(f"Received from {addr}: {line_str}")
-                    cmd = parse_command(line_str)
+                    if cmd.cmd == Command.PUSH:
+                        last_push = self._enqueue_push(cmd.args[0])
+                        await self._queue_reply(replies, replier, last_push)
+                        continue
 
-                    # Run handler in thread pool to avoid blocking
-                    loop = asyncio.get_event_loop()
-                    response = await loop.run_in_executor(
-                        self._executor, self._handler.handle, cmd
-                    )
+                    if last_push is not None:
+                        await last_push
+                        last_push = None
+                    response = self._handler.handle(cmd)
 
                 except ProtocolError as e:
-                    response = format_error(str(e))
+                    response = format_error_bytes(str(e))
                 except UnicodeDecodeError:
-                    response = format_error("Invalid UTF-8 encoding")
+                    response = format_error_bytes("Invalid UTF-8 encoding")
 
-                writer.write(response.encode("utf-8"))
-                await writer.drain()
+                await self._queue_reply(replies, replier, response)
 
         except ConnectionResetError:
             logger.debug(f"Client {addr} connection reset")
         except Exception as e:
             logger.exception(f"Error handling client {addr}")
         finally:
+            try:
+                await self._queue_reply(replies, replier, None)
+            except ConnectionResetError:
+                pass  # The replier has already stopped
+            try:
+                await replier
+            except ConnectionResetError:
+                logger.debug(f"Client {addr} connection reset")
+            except Exception:
+                logger.exception(f"Error writing replies to {addr}")
             writer.close()
             try:
                 await writer.wait_closed()
@@ -102,6 +175,133 @@ class PyQueueServer:
                 pass
             logger.info(f"Client disconnected: {addr}")
 
+    async def _write_replies(
+        self, writer: asyncio.StreamWriter, replies: asyncio.Queue
+    ) -> None:
+        """Write replies in request order until a None sentinel is queued.
+
+        PUSH replies are queued as futures and written once their batch is
+        on disk; everything else is queued as ready response frames. The
+        transport sends as much as it can immediately, so the writer only
+        drains once unsent data passes the high-water mark; a burst of
+        pipelined replies then costs one drain instead of one per reply.
+        """
+        high_water = self._config.write_buffer_high_water
+        while True:
+            reply = await replies.get()
+            if reply is None:
+                return
+            if isinstance(reply, asyncio.Future):
+                reply = await reply
+            writer.writelines(reply)
+            if writer.transport.get_write_buffer_size() > high_water:
+                await writer.drain()
+
+    async def _queue_reply(
+        self, replies: asyncio.Queue, replier: asyncio.Task, reply
+    ) -> None:
+        """Queue a reply for the replier, waiting while the queue is full.
+
+        Raises ConnectionResetError if the replier stops before there is
+        room, so a reader never waits on a queue nobody will empty.
+        """
+        if not replies.full():
+            replies.put_nowait(reply)
+            return
+
+        put = asyncio.ensure_future(replies.put(reply))
+        await asyncio.wait({put, replier}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            raise ConnectionResetError("Reply writer stopped")
+
+    def _enqueue_push(self, message: bytes) -> asyncio.Future:
+        """Queue a message for the next batched write.
+
+        Returns a future that resolves to the reply frames once the batch
+        containing the message has been written and fsynced. Once the
+        broker is stopping, the future is resolved with an error right away
+        since no further batches will be written.
+        """
+        future = asyncio.get_running_loop().create_future()
+        if not self._running:
+            future.set_result(format_error_bytes("Broker shutting down"))
+            return future
+        self._pending.append((message, future))
+        self._pending_ready.set()
+        return future
+
+    async def _flush_pushes(self) -> None:
+        """Write queued PUSHes to disk in batches, one fsync per batch."""
+        while True:
+            await self._pending_ready.wait()
+            self._pending_ready.clear()
+
+            while self._pending:
+                batch = self._take_batch()
+                messages = [message for message, _ in batch]
+                write = asyncio.ensure_future(self._write_batch(messages))
+                try:
+                    response = await asyncio.shield(write)
+                except asyncio.CancelledError:
+                    # The worker thread finishes the batch regardless, so
+                    # report what actually happened to it; an error reply
+                    # for messages already on disk would invite duplicates
+                    self._resolve_pushes(batch, await write)
+                    raise
+
+                self._resolve_pushes(batch, response)
+                logger.debug(f"Flushed batch of {len(batch)} messages")
+
+    async def _write_batch(self, messages: List[bytes]) -> List[bytes]:
+        """Write a batch in the worker thread and return the reply frames."""
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                self._executor, self._queue.push_batch, messages
+            )
+        except Exception as e:
+            logger.exception("Error flushing push batch")
+            return format_error_bytes(str(e))
+        return [OK_BYTES]
+
+    async def _flush_offsets(self) -> None:
+        """Periodically persist consumer offsets updated by PULLs."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self._config.offset_flush_interval)
+            try:
+                await loop.run_in_executor(
+                    self._offsets_executor, self._queue.flush_offsets
+                )
+            except Exception:
+                logger.exception("Error flushing consumer offsets")
+
+    def _resolve_pushes(
+        self, batch: List[Tuple[bytes, asyncio.Future]], response: List[bytes]
+    ) -> None:
+        """Resolve the reply futures of a batch of PUSHes."""
+        for _, future in batch:
+            if not future.done():
+                future.set_result(response)
+
+    def _take_batch(self) -> List[Tuple[bytes, asyncio.Future]]:
+        """Pop the oldest pending PUSHes, bounded by the configured batch limits."""
+        count = 0
+        size = 0
+        for message, _ in self._pending:
+            if count and (
+                count >= self._config.batch_max_messages
+                or size + len(message) > self._config.batch_max_bytes
+            ):
+                break
+            count += 1
+            size += len(message)
+
+        batch = self._pending[:count]
+        del self._pending[:count]
+        return batch
+
 
 def run_server(config: Optional[BrokerConfig] = None) -> None:
     """Run the broker server (blocking)."""
@@ -114,14 +314,23 @@ def run_server(config: Optional[BrokerConfig] = None) -> None:
 
     async def main():
         loop = asyncio.get_event_loop()
+        stopping: List[asyncio.Task] = []
 
         def signal_handler():
-            asyncio.create_task(server.stop())
+            if not stopping:
+                stopping.append(asyncio.create_task(server.stop()))
 
         for sig in (signal.SIGINT, signal.SIGTERM):
             loop.add_signal_handler(sig, signal_handler)
 
-        await server.start()
+        try:
+            await server.start()
+        except asyncio.CancelledError:
+            if not stopping:
+                raise
+        # Closing the server cancels start(); let stop() finish flushing
+        # buffered state before the event loop shuts down.
+        await asyncio.gather(*stopping)
 
     try:
         asyncio.run(main())
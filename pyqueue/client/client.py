@@ -1,7 +1,7 @@
 """Python client SDK for PyQueue."""
 
 import socket
-from typing import Optional
+from typing import BinaryIO, List, Optional
 
 
 class PyQueueError(Exception):
@@ -21,6 +21,9 @@ class PyQueueClient:
         client.close()
     """
 
+    # Most platforms cap a gathered send at 1024 buffers (IOV_MAX)
+    MAX_SEND_FRAMES = 1024
+
     def __init__(
         self,
         host: str = "127.0.0.1",
@@ -31,15 +34,22 @@ class PyQueueClient:
         self._port = port
         self._timeout = timeout
         self._socket: Optional[socket.socket] = None
+        self._rfile: Optional[BinaryIO] = None
 
     def connect(self) -> None:
         """Connect to the broker."""
         self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self._socket.settimeout(self._timeout)
         self._socket.connect((self._host, self._port))
+        # Requests and replies are tiny; don't let Nagle hold them back
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._rfile = self._socket.makefile("rb", buffering=65536)
 
     def close(self) -> None:
         """Close the connection to the broker."""
+        if self._rfile:
+            self._rfile.close()
+            self._rfile = None
         if self._socket:
             self._socket.close()
             self._socket = None
@@ -57,18 +67,55 @@ class PyQueueClient:
             PyQueueError: If the broker returns an error.
             ValueError: If the message contains newlines.
         """
-        if "\n" in message:
+        # UTF-8 never uses the newline byte inside a multi-byte sequence,
+        # so push_bytes' check on the encoded message is equivalent
+        return self.push_bytes(message.encode("utf-8"))
+
+    def push_bytes(self, message: bytes) -> bool:
+        """Push a raw message to the queue without any str encoding.
+
+        Args:
+            message: The message bytes to push. Must not contain newlines.
+
+        Returns:
+            True if the message was pushed successfully.
+
+        Raises:
+            PyQueueError: If the broker returns an error.
+            ValueError: If the message contains newlines.
+        """
+        if message.find(b"\n") != -1:
             raise ValueError("Message cannot contain newlines")
 
-        self._send(f"PUSH {message}\n")
-        response = self._receive()
+        self._send_frames([b"PUSH ", message, b"\n"])
+        self._parse_push_response(self._receive())
+        return True
 
-        if response.startswith("OK"):
-            return True
-        elif response.startswith("ERR"):
-            raise PyQueueError(response[4:].strip())
-        else:
-            raise PyQueueError(f"Unexpected response: {response}")
+    def push_many(self, messages: List[str]) -> None:
+        """Push several messages in a single round trip.
+
+        All requests are sent before any reply is read, so the broker can
+        write the whole batch to disk with one fsync.
+
+        Args:
+            messages: The messages to push, in order. Must not contain newlines.
+
+        Raises:
+            PyQueueError: If the broker returns an error for any message.
+            ValueError: If a message contains newlines.
+        """
+        frames = []
+        for message in messages:
+            data = message.encode("utf-8")
+            if data.find(b"\n") != -1:
+                raise ValueError("Message cannot contain newlines")
+            frames += (b"PUSH ", data, b"\n")
+
+        self._send_frames(frames)
+        responses = [self._receive() for _ in messages]
+
+        for response in responses:
+            self._parse_push_response(response)
 
     def pull(self, consumer_id: str) -> Optional[str]:
         """Pull the next message for a consumer.
@@ -79,12 +126,73 @@ class PyQueueClient:
         Returns:
             The message, or None if no messages are available.
 
+        Raises:
+            PyQueueError: If the broker returns an error.
+        """
+        messages = self.pull_many(consumer_id, 1)
+        return messages[0] if messages else None
+
+    def pull_bytes(self, consumer_id: str) -> Optional[bytes]:
+        """Pull the next message for a consumer as raw bytes.
+
+        Use this to consume messages pushed with ``push_bytes`` that are not
+        valid UTF-8; ``pull`` cannot decode them.
+
+        Args:
+            consumer_id: Unique identifier for this consumer.
+
+        Returns:
+            The message bytes, or None if no messages are available.
+
         Raises:
             PyQueueError: If the broker returns an error.
         """
         self._send(f"PULL {consumer_id}\n")
-        response = self._receive()
+        response = self._receive_bytes()
+
+        if response.startswith(b"MSG "):
+            return response[4:-1]
+        elif response.startswith(b"EMPTY"):
+            return None
+        # Errors are plain text; decode them the same way as pull's replies
+        return self._parse_pull_response(self._decode(response))
+
+    def pull_many(self, consumer_id: str, count: int) -> List[str]:
+        """Pull up to ``count`` messages for a consumer in a single round trip.
+
+        Args:
+            consumer_id: Unique identifier for this consumer.
+            count: Maximum number of messages to pull.
+
+        Returns:
+            The messages in order; fewer than ``count`` if the queue ran out.
+
+        Raises:
+            PyQueueError: If the broker returns an error.
+        """
+        self._send(f"PULL {consumer_id}\n" * count)
+        # Read every reply before decoding any, so a reply that fails to
+        # decode does not leave the rest queued for later calls
+        responses = [self._receive_bytes() for _ in range(count)]
+
+        messages = []
+        for response in responses:
+            message = self._parse_pull_response(self._decode(response))
+            if message is not None:
+                messages.append(message)
+        return messages
+
+    def _parse_push_response(self, response: str) -> None:
+        """Check the broker's reply to a PUSH."""
+        if response.startswith("OK"):
+            return
+        elif response.startswith("ERR"):
+            raise PyQueueError(response[4:].strip())
+        else:
+            raise PyQueueError(f"Unexpected response: {response}")
 
+    def _parse_pull_response(self, response: str) -> Optional[str]:
+        """Extract the message from the broker's reply to a PULL."""
         if response.startswith("MSG "):
             return response[4:].strip()
         elif response.startswith("EMPTY"):
@@ -100,21 +208,41 @@ class PyQueueClient:
             raise PyQueueError("Not connected")
         self._socket.sendall(data.encode("utf-8"))
 
+    def _send_frames(self, frames: List[bytes]) -> None:
+        """Send frames with one gathered sendmsg instead of concatenating them."""
+        if not self._socket:
+            raise PyQueueError("Not connected")
+        if len(frames) > self.MAX_SEND_FRAMES or not hasattr(self._socket, "sendmsg"):
+            self._socket.sendall(b"".join(frames))
+            return
+
+        sent = self._socket.sendmsg(frames)
+        if sent < sum(len(frame) for frame in frames):
+            self._socket.sendall(b"".join(frames)[sent:])
+
     def _receive(self) -> str:
         """Receive a line from the broker."""
-        if not self._socket:
+        return self._decode(self._receive_bytes())
+
+    def _receive_bytes(self) -> bytes:
+        """Receive a line from the broker, including the newline."""
+        if not self._rfile:
             raise PyQueueError("Not connected")
 
-        data = b""
-        while True:
-            chunk = self._socket.recv(1)
-            if not chunk:
-                raise PyQueueError("Connection closed by broker")
-            data += chunk
-            if chunk == b"\n":
-                break
+        data = self._rfile.readline()
+        if not data.endswith(b"\n"):
+            raise PyQueueError("Connection closed by broker")
+
+        return data
 
-        return data.decode("utf-8")
+    def _decode(self, data: bytes) -> str:
+        """Decode a reply, rejecting messages that are not valid UTF-8."""
+        try:
+            return data.decode("utf-8")
+        except UnicodeDecodeError:
+            raise PyQueueError(
+                "Message is not valid UTF-8; use pull_bytes to read it"
+            ) from None
 
     def __enter__(self) -> "PyQueueClient":
         """Context manager entry."""
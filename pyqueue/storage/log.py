@@ -1,8 +1,38 @@
 """Append-only log storage for messages."""
 
+import errno
+import mmap
+import os
 import struct
 from pathlib import Path
-from typing import Iterator
+from typing import Iterator, List, Optional, Tuple
+
+
+def _iov_max() -> int:
+    """Return the maximum number of buffers accepted by a single writev."""
+    try:
+        limit = os.sysconf("SC_IOV_MAX")
+    except (AttributeError, ValueError, OSError):
+        limit = -1
+    return limit if limit > 0 else 1024
+
+
+# Data-only sync is enough once the file size is preallocated
+_datasync = getattr(os, "fdatasync", os.fsync)
+
+# Linux lets a single pwritev carry O_DSYNC semantics, combining the write
+# and the data sync into one system call
+_RWF_DSYNC = getattr(os, "RWF_DSYNC", 0) if hasattr(os, "pwritev") else 0
+
+
+def _all_zero(mm: mmap.mmap, start: int, end: int, chunk: int = 1024 * 1024) -> bool:
+    """Return True if ``mm[start:end]`` contains only zero bytes."""
+    zeros = bytes(min(chunk, end - start))
+    for pos in range(start, end, chunk):
+        stop = min(pos + chunk, end)
+        if mm[pos:stop] != zeros[: stop - pos]:
+            return False
+    return True
 
 
 class AppendLog:
@@ -10,67 +40,217 @@ class AppendLog:
 
     Storage format: [4-byte length][message bytes][4-byte length][message bytes]...
     Uses big-endian unsigned int for length prefix (supports up to 4GB messages).
+
+    The file is grown in ``preallocate_size`` chunks (PREALLOCATE_SIZE by
+    default) so that syncing a batch only has to flush data blocks, not a
+    new file size. Unused preallocated space is zero-filled, so a zero
+    length header followed only by zeros marks the end of the log, and new
+    empty records cannot be stored. Empty records
+    written by older versions are still read back, except at the very end
+    of the file, where they are indistinguishable from preallocated space.
+    The file is truncated back to its records on close, and on open after a
+    crash. Records carry no checksum, so a torn write from an unsynced (and
+    therefore unacknowledged) batch can still be read back as a record on
+    recovery.
     """
 
     HEADER_SIZE = 4  # bytes for length prefix
+    IOV_MAX = _iov_max()
+    PREALLOCATE_SIZE = 64 * 1024 * 1024
 
-    def __init__(self, path: str) -> None:
+    def __init__(self, path: str, preallocate_size: Optional[int] = None) -> None:
         self._path = Path(path)
+        self._preallocate_size = (
+            self.PREALLOCATE_SIZE if preallocate_size is None else preallocate_size
+        )
         self._path.parent.mkdir(parents=True, exist_ok=True)
-        self._file = open(self._path, "ab+")
-        self._file.seek(0, 2)  # Seek to end
-        self._write_offset = self._file.tell()
+        # Unbuffered descriptor so headers and payloads can be handed to
+        # pwritev without being copied into one buffer first
+        self._fd = os.open(self._path, os.O_WRONLY | os.O_CREAT, 0o644)
+        # Reads are served from a read-only map of the log, grown on demand
+        self._rfd = os.open(self._path, os.O_RDONLY)
+        self._mm: Optional[mmap.mmap] = None
 
-    def append(self, data: bytes) -> int:
-        """Append data to the log and return the offset where it was written."""
+        # Drop preallocated space and any torn record left by a crash so
+        # new records are written straight after the last complete one
+        self._write_offset = 0
+        for offset, length in self.scan():
+            self._write_offset = offset + self.HEADER_SIZE + length
+        if os.fstat(self._fd).st_size > self._write_offset:
+            os.ftruncate(self._fd, self._write_offset)
+
+        self._allocated = self._write_offset
+        self._preallocate = hasattr(os, "posix_fallocate")
+        self._dsync_flag = _RWF_DSYNC
+
+    def append(self, data: bytes) -> Tuple[int, int]:
+        """Append data to the log and return the (offset, length) of the record."""
         offset = self._write_offset
         length = len(data)
-        header = struct.pack(">I", length)
-        self._file.write(header + data)
-        self._file.flush()
+        if not length:
+            raise ValueError("Cannot append an empty record")
+        self._reserve(offset + self.HEADER_SIZE + length)
+        self._write_all([struct.pack(">I", length), data], offset)
         self._write_offset += self.HEADER_SIZE + length
-        return offset
+        return (offset, length)
+
+    def append_batch(self, records: List[bytes]) -> List[Tuple[int, int]]:
+        """Append several records with a single gathered write and data sync.
+
+        Returns the (offset, length) of each record, in order.
+        """
+        entries = []
+        chunks = []
+        start = offset = self._write_offset
+        for data in records:
+            length = len(data)
+            if not length:
+                raise ValueError("Cannot append an empty record")
+            entries.append((offset, length))
+            chunks.append(struct.pack(">I", length))
+            chunks.append(data)
+            offset += self.HEADER_SIZE + length
+
+        self._reserve(offset)
+        self._write_all(chunks, start, sync=True)
+        self._write_offset = offset
+        return entries
+
+    def _reserve(self, end: int) -> None:
+        """Preallocate file space so that it extends at least to ``end``."""
+        if end <= self._allocated or not self._preallocate:
+            return
+        size = max(end - self._allocated, self._preallocate_size)
+        try:
+            os.posix_fallocate(self._fd, self._allocated, size)
+        except OSError:
+            # Unsupported filesystem or out of space: fall back to growing
+            # the file one write at a time
+            self._preallocate = False
+        else:
+            self._allocated += size
+
+    def _write_all(self, buffers: List[bytes], offset: int, sync: bool = False) -> None:
+        """Write buffers in order at ``offset``, finishing any short write.
+
+        With ``sync`` the data is on disk when this returns. If the batch fits
+        in one pwritev and RWF_DSYNC is supported, the write and the sync are
+        a single system call; otherwise an fdatasync follows the writes.
+        """
+        if sync and self._dsync_flag and len(buffers) <= self.IOV_MAX:
+            try:
+                written = os.pwritev(self._fd, buffers, offset, self._dsync_flag)
+            except OSError as e:
+                if e.errno not in (errno.EINVAL, errno.EOPNOTSUPP, errno.ENOSYS):
+                    raise
+                self._dsync_flag = 0  # Kernel predates RWF_DSYNC
+            else:
+                if written == sum(len(buf) for buf in buffers):
+                    return
+                buffers = [memoryview(b"".join(buffers))[written:]]
+                offset += written
+
+        for start in range(0, len(buffers), self.IOV_MAX):
+            chunk = buffers[start : start + self.IOV_MAX]
+            size = sum(len(buf) for buf in chunk)
+            written = self._pwritev(chunk, offset)
+            if written < size:
+                remaining = memoryview(b"".join(chunk))[written:]
+                while remaining:
+                    n = os.pwrite(self._fd, remaining, offset + size - len(remaining))
+                    remaining = remaining[n:]
+            offset += size
+
+        if sync:
+            _datasync(self._fd)
+
+    def _pwritev(self, buffers: List[bytes], offset: int) -> int:
+        """Gathered write at ``offset``, emulated with a seek where unavailable."""
+        if hasattr(os, "pwritev"):
+            return os.pwritev(self._fd, buffers, offset)
+        os.lseek(self._fd, offset, os.SEEK_SET)
+        return os.writev(self._fd, buffers)
 
     def read_at(self, offset: int) -> bytes:
         """Read a record at the given offset."""
-        with open(self._path, "rb") as f:
-            f.seek(offset)
-            header = f.read(self.HEADER_SIZE)
-            if len(header) < self.HEADER_SIZE:
-                raise ValueError(f"Invalid offset {offset}: incomplete header")
-            length = struct.unpack(">I", header)[0]
-            data = f.read(length)
-            if len(data) < length:
-                raise ValueError(f"Invalid offset {offset}: incomplete data")
-            return data
-
-    def replay(self) -> Iterator[tuple[int, bytes]]:
+        mm = self._mapped(offset + self.HEADER_SIZE)
+        if mm is None:
+            raise ValueError(f"Invalid offset {offset}: incomplete header")
+        length = struct.unpack_from(">I", mm, offset)[0]
+        return self.read_exact(offset, length)
+
+    def read_exact(self, offset: int, length: int) -> bytes:
+        """Read a record whose length is already known, skipping the header."""
+        start = offset + self.HEADER_SIZE
+        end = start + length
+        mm = self._mapped(end)
+        if mm is None:
+            raise ValueError(f"Invalid offset {offset}: incomplete data")
+        return mm[start:end]
+
+    def _mapped(self, end: int) -> Optional[mmap.mmap]:
+        """Return a map covering the log up to ``end``, or None if it is shorter.
+
+        A map is only replaced once the log has grown past it. Superseded maps
+        are not closed explicitly so that concurrent readers still holding one
+        can finish; they are released when the last reference goes away.
+        """
+        if self._rfd < 0:
+            raise ValueError("Log is closed")
+        if end > self._write_offset:
+            return None
+        mm = self._mm
+        if mm is not None and len(mm) >= end:
+            return mm
+
+        size = os.fstat(self._rfd).st_size
+        mm = mmap.mmap(self._rfd, size, access=mmap.ACCESS_READ)
+        self._mm = mm
+        return mm
+
+    def replay(self) -> Iterator[Tuple[int, int, bytes]]:
         """Replay all records from the log for recovery.
 
-        Yields (offset, data) tuples for each record.
+        Yields (offset, length, data) tuples for each record.
+        """
+        for offset, length in self.scan():
+            yield (offset, length, self.read_exact(offset, length))
+
+    def scan(self) -> Iterator[Tuple[int, int]]:
+        """Yield (offset, length) for each complete record in the file.
+
+        Walks the headers of a read-only map of the whole file, so recovery
+        costs no system call per record and never copies payloads.
         """
-        with open(self._path, "rb") as f:
+        size = os.fstat(self._rfd).st_size
+        if size == 0:
+            return
+        unpack_from = struct.Struct(">I").unpack_from
+        with mmap.mmap(self._rfd, size, access=mmap.ACCESS_READ) as mm:
             offset = 0
-            while True:
-                header = f.read(self.HEADER_SIZE)
-                if len(header) == 0:
-                    break  # EOF
-                if len(header) < self.HEADER_SIZE:
-                    break  # Truncated header, stop recovery
-                length = struct.unpack(">I", header)[0]
-                data = f.read(length)
-                if len(data) < length:
+            while offset + self.HEADER_SIZE <= size:
+                (length,) = unpack_from(mm, offset)
+                if length == 0 and _all_zero(mm, offset, size):
+                    break  # Start of preallocated space
+                if offset + self.HEADER_SIZE + length > size:
                     break  # Truncated data, stop recovery
-                yield (offset, data)
+                yield (offset, length)
                 offset += self.HEADER_SIZE + length
 
     def flush(self) -> None:
         """Flush pending writes to disk."""
-        self._file.flush()
+        _datasync(self._fd)
 
     def close(self) -> None:
-        """Close the log file."""
-        self._file.close()
+        """Trim preallocated space and close the log file."""
+        if self._allocated > self._write_offset:
+            os.ftruncate(self._fd, self._write_offset)
+        os.close(self._fd)
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        os.close(self._rfd)
+        self._rfd = -1
 
     @property
     def size(self) -> int:
@@ -1,45 +1,228 @@
-"""Consumer offset tracking with JSON persistence."""
+"""Consumer offset tracking with append-only log persistence."""
 
+import array
 import json
+import os
+import struct
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional, Set, Tuple
 
 
 class OffsetStore:
-    """Persists consumer offsets to a JSON file.
+    """Persists consumer offsets to an append-only log.
 
     Each consumer has an independent offset tracking their position in the queue.
+    Updates append a small record instead of rewriting every offset, and the
+    last record for a consumer wins on replay. The log is compacted back to one
+    record per consumer once it outgrows the live set.
+
+    ``set`` only updates memory; changed offsets are written by ``save``, which
+    the owner calls periodically. A crash loses at most the unsaved updates,
+    which means redelivery rather than message loss. ``save`` is ``collect``
+    followed by ``write``: only ``collect`` reads the in-memory offsets, so an
+    owner sharing the store between threads can hold its lock for that step
+    alone and do the file I/O (including compaction) outside it.
+
+    Consumers are interned to small integer slots when their offset is first
+    set, and their offsets kept in a packed array. Reads never intern, so
+    looking up unknown ids does not grow the store. Hot paths can resolve a
+    slot once with ``lookup`` or ``slot`` and then use ``get_at``/``set_at``
+    without rehashing the id.
+    The id-to-slot map is rebuilt from the log records on load.
+
+    Record format: [4-byte id length][consumer id bytes][8-byte offset]
     """
 
-    def __init__(self, path: str) -> None:
+    ID_HEADER = struct.Struct(">I")
+    OFFSET = struct.Struct(">Q")
+    RECORD_OVERHEAD = ID_HEADER.size + OFFSET.size
+
+    # Compact when the log exceeds COMPACT_RATIO x the live set, but never
+    # below COMPACT_MIN_SIZE so small stores are not rewritten constantly.
+    COMPACT_RATIO = 2
+    COMPACT_MIN_SIZE = 1024 * 1024
+
+    def __init__(self, path: str, legacy_path: Optional[str] = None) -> None:
         self._path = Path(path)
         self._path.parent.mkdir(parents=True, exist_ok=True)
-        self._offsets: Dict[str, int] = {}
-        self.load()
+        self._legacy_path = Path(legacy_path) if legacy_path else None
+        self._slots: Dict[str, int] = {}
+        self._consumer_ids: List[str] = []
+        self._offsets = array.array("Q")
+        self._live_size = 0
+        self._log_size = 0
+        # Slots whose offset changed since the last save
+        self._dirty: Set[int] = set()
+
+        migrated = self.load()
+        self._file = open(self._path, "ab")
+        if migrated:
+            self.compact()
+
+    def slot(self, consumer_id: str) -> int:
+        """Return the slot for a consumer, registering it at offset 0 if new."""
+        slot = self._slots.get(consumer_id)
+        if slot is None:
+            slot = len(self._consumer_ids)
+            self._slots[consumer_id] = slot
+            self._consumer_ids.append(consumer_id)
+            self._offsets.append(0)
+            self._live_size += self.RECORD_OVERHEAD + len(consumer_id.encode("utf-8"))
+        return slot
+
+    def lookup(self, consumer_id: str) -> Optional[int]:
+        """Return the slot for a consumer, or None if it has no offset yet."""
+        return self._slots.get(consumer_id)
 
     def get(self, consumer_id: str) -> int:
         """Get the current offset for a consumer. Returns 0 if not found."""
-        return self._offsets.get(consumer_id, 0)
+        slot = self._slots.get(consumer_id)
+        return 0 if slot is None else self._offsets[slot]
+
+    def get_at(self, slot: int) -> int:
+        """Get the current offset for a consumer slot."""
+        return self._offsets[slot]
 
     def set(self, consumer_id: str, offset: int) -> None:
-        """Set the offset for a consumer and persist to disk."""
-        self._offsets[consumer_id] = offset
-        self.save()
+        """Set the offset for a consumer. Persisted on the next ``save``."""
+        self.set_at(self.slot(consumer_id), offset)
+
+    def set_at(self, slot: int, offset: int) -> None:
+        """Set the offset for a consumer slot. Persisted on the next ``save``."""
+        self._offsets[slot] = offset
+        self._dirty.add(slot)
 
     def save(self) -> None:
-        """Persist offsets to disk."""
-        with open(self._path, "w") as f:
-            json.dump(self._offsets, f)
+        """Append records for offsets changed since the last save and flush."""
+        self.write(self.collect())
+
+    def collect(self) -> Tuple[bytes, bool]:
+        """Encode the offsets changed since the last save, for ``write``.
+
+        Returns (data, is_snapshot). Once the log has outgrown the live set,
+        data is a full snapshot that ``write`` swaps in as the new log.
+        """
+        if not self._dirty:
+            return b"", False
+
+        records = b"".join(
+            self._encode(self._consumer_ids[slot], self._offsets[slot])
+            for slot in self._dirty
+        )
+        self._dirty.clear()
+        self._log_size += len(records)
+
+        if self._log_size > max(
+            self.COMPACT_MIN_SIZE, self.COMPACT_RATIO * self._live_size
+        ):
+            snapshot = self._snapshot()
+            self._log_size = self._live_size = len(snapshot)
+            return snapshot, True
+        return records, False
 
-    def load(self) -> None:
-        """Load offsets from disk if the file exists."""
-        if self._path.exists():
+    def write(self, pending: Tuple[bytes, bool]) -> None:
+        """Write data returned by ``collect`` to the log.
+
+        Calls must be serialized and made in the order the data was collected.
+        """
+        data, is_snapshot = pending
+        if is_snapshot:
+            self._replace(data)
+        elif data:
+            self._file.write(data)
+            self._file.flush()
+
+    def load(self) -> bool:
+        """Load offsets by replaying the log if the file exists.
+
+        Falls back to the legacy JSON offsets file when no log exists yet.
+        Returns True if offsets were migrated from the legacy file.
+        """
+        self._reset()
+        if not self._path.exists():
+            return self._load_legacy()
+
+        data = self._path.read_bytes()
+        pos = 0
+        while pos + self.ID_HEADER.size <= len(data):
+            (id_length,) = self.ID_HEADER.unpack_from(data, pos)
+            id_end = pos + self.ID_HEADER.size + id_length
+            end = id_end + self.OFFSET.size
+            if end > len(data):
+                break  # Truncated record, stop recovery
+            id_bytes = data[pos + self.ID_HEADER.size : id_end]
             try:
-                with open(self._path, "r") as f:
-                    self._offsets = json.load(f)
-            except (json.JSONDecodeError, IOError):
-                self._offsets = {}
+                consumer_id = id_bytes.decode("utf-8")
+            except UnicodeDecodeError:
+                break  # Corrupt record, stop recovery
+            (offset,) = self.OFFSET.unpack_from(data, id_end)
+            self._offsets[self.slot(consumer_id)] = offset
+            pos = end
+
+        if pos < len(data):
+            # Drop a partially written trailing record so appends stay aligned
+            os.truncate(self._path, pos)
+
+        self._log_size = pos
+        return False
+
+    def compact(self) -> None:
+        """Rewrite the log as a snapshot holding one record per consumer."""
+        snapshot = self._snapshot()
+        self._dirty.clear()
+        self._log_size = self._live_size = len(snapshot)
+        self._replace(snapshot)
+
+    def _snapshot(self) -> bytes:
+        """Encode one record per consumer with its current offset."""
+        return b"".join(
+            self._encode(consumer_id, offset)
+            for consumer_id, offset in zip(self._consumer_ids, self._offsets)
+        )
+
+    def _replace(self, snapshot: bytes) -> None:
+        """Atomically replace the log file with ``snapshot``."""
+        tmp_path = self._path.with_name(self._path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(snapshot)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._file.close()
+        os.replace(tmp_path, self._path)
+        self._file = open(self._path, "ab")
+
+    def close(self) -> None:
+        """Flush and close the offset log."""
+        self.save()
+        self._file.close()
 
     def all_offsets(self) -> Dict[str, int]:
         """Return a copy of all consumer offsets."""
-        return self._offsets.copy()
+        return dict(zip(self._consumer_ids, self._offsets))
+
+    def _reset(self) -> None:
+        """Forget all consumers and offsets held in memory."""
+        self._slots = {}
+        self._consumer_ids = []
+        self._offsets = array.array("Q")
+        self._live_size = 0
+        self._dirty.clear()
+
+    def _load_legacy(self) -> bool:
+        """Load offsets from the legacy JSON file, if configured and present."""
+        if not self._legacy_path or not self._legacy_path.exists():
+            return False
+        try:
+            with open(self._legacy_path, "r") as f:
+                legacy: Dict[str, int] = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return False
+        for consumer_id, offset in legacy.items():
+            self._offsets[self.slot(consumer_id)] = offset
+        return bool(legacy)
+
+    def _encode(self, consumer_id: str, offset: int) -> bytes:
+        """Encode a single offset record."""
+        cid = consumer_id.encode("utf-8")
+        return self.ID_HEADER.pack(len(cid)) + cid + self.OFFSET.pack(offset)
@@ -1,11 +1,20 @@
 """High-level persistent queue combining log storage and offset tracking."""
 
+import array
 import threading
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Union
 
 from .log import AppendLog
 from .offsets import OffsetStore
+from .rwlock import RWLock
+
+
+def _to_bytes(message: Union[str, bytes]) -> bytes:
+    """Encode str messages as UTF-8; bytes are stored as-is."""
+    if isinstance(message, str):
+        return message.encode("utf-8")
+    return message
 
 
 class PersistentQueue:
@@ -14,67 +23,139 @@ class PersistentQueue:
     Messages are stored in an append-only log. Each consumer maintains
     their own offset, allowing multiple consumers to read independently.
 
-    Thread-safe: all operations are protected by a lock.
+    Thread-safe. The message index sits behind a readers-writer lock. A PULL
+    claims its message under the offsets lock, then copies the payload out
+    holding only the shared side of the index lock, so PULLs read
+    concurrently and close() waits for reads in flight. Log writes are
+    serialized separately so a batch can be synced without blocking
+    readers. Consumer offsets are written to disk outside the offsets lock,
+    so a save or compaction does not stall PULLs. Locks are always taken in
+    the order write, offset save, offsets, index.
     """
 
-    def __init__(self, data_dir: str) -> None:
+    def __init__(self, data_dir: str, preallocate_size: Optional[int] = None) -> None:
         self._data_dir = Path(data_dir)
         self._data_dir.mkdir(parents=True, exist_ok=True)
 
-        self._log = AppendLog(str(self._data_dir / "queue.log"))
-        self._offsets = OffsetStore(str(self._data_dir / "offsets.json"))
-        self._lock = threading.Lock()
-
-        # In-memory index: list of (offset, length) for each message
-        self._index: List[int] = []
+        self._log = AppendLog(
+            str(self._data_dir / "queue.log"), preallocate_size=preallocate_size
+        )
+        self._offsets = OffsetStore(
+            str(self._data_dir / "offsets.log"),
+            legacy_path=str(self._data_dir / "offsets.json"),
+        )
+        self._index_lock = RWLock()
+        self._offsets_lock = threading.Lock()
+        # Serializes offset log writes, which happen outside _offsets_lock
+        self._offsets_save_lock = threading.Lock()
+        # Serializes log writes so batches can hit disk without blocking pulls
+        self._write_lock = threading.Lock()
+
+        # In-memory index as parallel packed arrays: log offset and length of
+        # each message. Much smaller than a list of tuples for large logs.
+        self._index_offsets = array.array("Q")
+        self._index_lengths = array.array("I")
 
         # Recover state from disk
         self._recover()
 
     def _recover(self) -> None:
-        """Replay log to rebuild in-memory index."""
-        for offset, _ in self._log.replay():
-            self._index.append(offset)
-
-    def push(self, message: str) -> int:
+        """Scan the log headers to rebuild the in-memory index."""
+        # Stream straight into the packed arrays; collecting the scan first
+        # would hold a tuple per record and defeat their compactness
+        append_offset = self._index_offsets.append
+        append_length = self._index_lengths.append
+        for offset, length in self._log.scan():
+            append_offset(offset)
+            append_length(length)
+
+    def push(self, message: Union[str, bytes]) -> int:
         """Push a message to the queue. Returns the message index."""
-        with self._lock:
-            data = message.encode("utf-8")
-            offset = self._log.append(data)
-            index = len(self._index)
-            self._index.append(offset)
+        with self._write_lock, self._index_lock.write_locked():
+            data = _to_bytes(message)
+            offset, length = self._log.append(data)
+            index = len(self._index_offsets)
+            self._index_offsets.append(offset)
+            self._index_lengths.append(length)
             return index
 
-    def pull(self, consumer_id: str) -> Optional[str]:
-        """Pull the next message for a consumer.
+    def push_batch(self, messages: List[Union[str, bytes]]) -> List[int]:
+        """Push several messages with a single write and fsync.
 
-        Returns None if no new messages are available.
-        Advances the consumer's offset on success.
+        The disk write happens before the index lock is taken so pulls are
+        not blocked while the batch is flushed. Returns the message indices.
         """
-        with self._lock:
-            consumer_offset = self._offsets.get(consumer_id)
-
-            if consumer_offset >= len(self._index):
-                return None
-
-            log_offset = self._index[consumer_offset]
-            data = self._log.read_at(log_offset)
-            message = data.decode("utf-8")
-
-            self._offsets.set(consumer_id, consumer_offset + 1)
-            return message
+        records = [_to_bytes(message) for message in messages]
+        with self._write_lock:
+            entries = self._log.append_batch(records)
+            with self._index_lock.write_locked():
+                start = len(self._index_offsets)
+                for offset, length in entries:
+                    self._index_offsets.append(offset)
+                    self._index_lengths.append(length)
+        return list(range(start, start + len(entries)))
+
+    def pull(self, consumer_id: str) -> Optional[bytes]:
+        """Pull the next message for a consumer as raw bytes.
+
+        Returns None if no new messages are available. The consumer's offset
+        is advanced before the payload is read and rewound if the read fails,
+        so the message is delivered again rather than skipped.
+        """
+        with self._offsets_lock:
+            # Only consumers that receive a message are registered, so PULLs
+            # for arbitrary ids on an empty queue leave no state behind
+            slot = self._offsets.lookup(consumer_id)
+            consumer_offset = 0 if slot is None else self._offsets.get_at(slot)
+
+            with self._index_lock.read_locked():
+                if consumer_offset >= len(self._index_offsets):
+                    return None
+                log_offset = self._index_offsets[consumer_offset]
+                length = self._index_lengths[consumer_offset]
+
+            if slot is None:
+                slot = self._offsets.slot(consumer_id)
+            self._offsets.set_at(slot, consumer_offset + 1)
+
+        try:
+            # Indexed records are never rewritten, so the copy needs no
+            # exclusive lock; the shared index lock only keeps close() from
+            # unmapping the log mid-read
+            with self._index_lock.read_locked():
+                return self._log.read_exact(log_offset, length)
+        except Exception:
+            with self._offsets_lock:
+                # Rewinding may redeliver messages claimed since, which
+                # at-least-once delivery allows; skipping this one would not
+                if self._offsets.get_at(slot) > consumer_offset:
+                    self._offsets.set_at(slot, consumer_offset)
+            raise
 
     def message_count(self) -> int:
         """Return the total number of messages in the queue."""
-        with self._lock:
-            return len(self._index)
+        with self._index_lock.read_locked():
+            return len(self._index_offsets)
 
     def consumer_offset(self, consumer_id: str) -> int:
         """Return the current offset for a consumer."""
-        with self._lock:
+        with self._offsets_lock:
             return self._offsets.get(consumer_id)
 
+    def flush_offsets(self) -> None:
+        """Persist consumer offsets that changed since the last flush.
+
+        Only collecting the changes holds the offsets lock; the file write
+        and any compaction happen after it is released.
+        """
+        with self._offsets_save_lock:
+            with self._offsets_lock:
+                pending = self._offsets.collect()
+            self._offsets.write(pending)
+
     def close(self) -> None:
         """Close the queue and underlying storage."""
-        with self._lock:
-            self._log.close()
+        with self._write_lock, self._offsets_save_lock, self._offsets_lock:
+            with self._index_lock.write_locked():
+                self._log.close()
+                self._offsets.close()
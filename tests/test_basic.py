@@ -1,14 +1,18 @@
 """Integration tests for PyQueue."""
 
+import importlib.util
+import multiprocessing
 import os
 import shutil
-import signal
 import socket
+import struct
 import subprocess
 import sys
 import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Optional
 
 import pytest
 
@@ -17,80 +21,211 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from pyqueue.client import PyQueueClient, PyQueueError
 from pyqueue.broker.config import BrokerConfig
+from pyqueue.broker.server import run_server
 
 
-def wait_for_port(host: str, port: int, timeout: float = 10.0) -> bool:
-    """Wait for a port to become available."""
-    start = time.time()
-    while time.time() - start < timeout:
-        try:
-            with socket.create_connection((host, port), timeout=1):
-                return True
-        except (socket.error, ConnectionRefusedError):
-            time.sleep(0.1)
-    return False
+# Polling starts fast and backs off, so a broker that is ready in a few
+# milliseconds is not made to wait a full fixed interval
+POLL_INITIAL_DELAY = 0.005
+POLL_MAX_DELAY = 0.1
+# Short enough that the backoff, not a stalled connect, sets the poll cadence
+PROBE_TIMEOUT = 0.05
+
+# How long a broker gets to shut down cleanly before it is killed
+STOP_GRACE_PERIOD = 0.5
+
+RAM_TEMP_DIR = (
+    "/dev/shm"
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK)
+    else None
+)
+
+# Preallocated log space is real memory on tmpfs, and Docker's default
+# /dev/shm is only 64 MB. Test logs are tiny, so brokers preallocate in
+# small steps.
+TEST_PREALLOCATE_SIZE = 1024 * 1024
+
+# Run a test class in its own forked process when pytest-forked is installed
+forked = (
+    pytest.mark.forked
+    if importlib.util.find_spec("pytest_forked")
+    else lambda cls: cls
+)
+
+# Forking shares the already imported pyqueue modules with the broker
+FORK_CONTEXT = (
+    multiprocessing.get_context("fork")
+    if "fork" in multiprocessing.get_all_start_methods()
+    else None
+)
+
+
+def probe_port(host: str, port: int) -> bool:
+    """Return True if something accepts connections on the port.
+
+    The probe socket resets the connection on close instead of lingering in
+    TIME_WAIT, so repeated polling does not leave sockets behind.
+    """
+    sock = socket.socket()
+    try:
+        sock.settimeout(PROBE_TIMEOUT)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        sock.connect((host, port))
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
 
 
 def wait_for_port_closed(host: str, port: int, timeout: float = 10.0) -> bool:
     """Wait for a port to be closed."""
     start = time.time()
+    delay = POLL_INITIAL_DELAY
     while time.time() - start < timeout:
-        try:
-            with socket.create_connection((host, port), timeout=1):
-                time.sleep(0.1)
-        except (socket.error, ConnectionRefusedError):
+        if not probe_port(host, port):
             return True
+        time.sleep(delay)
+        delay = min(delay * 2, POLL_MAX_DELAY)
     return False
 
 
+def free_port(host: str = "127.0.0.1") -> int:
+    """Return a TCP port that is currently free on the host.
+
+    Each broker gets its own port so that test modules and pytest-xdist
+    workers can run brokers side by side.
+    """
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def run_quiet_broker(config: BrokerConfig) -> None:
+    """Run a broker in a forked process with its output discarded.
+
+    The fork would otherwise write its logs into the test process's
+    captured output.
+    """
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    os.close(devnull)
+    run_server(config)
+
+
 class BrokerProcess:
-    """Manages a broker subprocess for testing."""
+    """Manages a broker process for testing."""
 
-    def __init__(self, data_dir: str, port: int = 5556):
+    def __init__(self, data_dir: str, port: Optional[int] = None):
         self.data_dir = data_dir
-        self.port = port
+        self.port = port if port is not None else free_port()
         self.host = "127.0.0.1"
         self.process = None
 
     def start(self) -> None:
-        """Start the broker process."""
+        """Start the broker process.
+
+        Where fork is available the broker is forked from the test process,
+        which already has pyqueue imported; otherwise a fresh interpreter is
+        spawned.
+        """
+        if FORK_CONTEXT is not None:
+            config = BrokerConfig(
+                host=self.host,
+                port=self.port,
+                data_dir=self.data_dir,
+                preallocate_size=TEST_PREALLOCATE_SIZE,
+            )
+            self.process = FORK_CONTEXT.Process(
+                target=run_quiet_broker, args=(config,), daemon=True
+            )
+            self.process.start()
+        else:
+            self.process = self._spawn()
+
+        try:
+            self._wait_ready()
+        except RuntimeError:
+            self.stop()
+            raise
+
+    def _wait_ready(self, timeout: float = 10.0) -> None:
+        """Wait for the broker to accept connections.
+
+        Raises RuntimeError as soon as the broker process exits, rather than
+        polling a port that will never open until the timeout.
+        """
+        start = time.time()
+        delay = POLL_INITIAL_DELAY
+        while time.time() - start < timeout:
+            exitcode = self._exitcode()
+            if exitcode is not None:
+                raise RuntimeError(f"Broker exited during startup with code {exitcode}")
+            if probe_port(self.host, self.port):
+                return
+            time.sleep(delay)
+            delay = min(delay * 2, POLL_MAX_DELAY)
+        raise RuntimeError("Broker failed to start")
+
+    def _exitcode(self) -> Optional[int]:
+        """Return the broker's exit code, or None while it is running."""
+        if isinstance(self.process, subprocess.Popen):
+            return self.process.poll()
+        return self.process.exitcode
+
+    def _spawn(self) -> subprocess.Popen:
+        """Run the broker in a new interpreter."""
         env = os.environ.copy()
         env["PYTHONPATH"] = str(Path(__file__).parent.parent)
 
-        self.process = subprocess.Popen(
+        return subprocess.Popen(
             [
                 sys.executable,
+                # pyqueue needs nothing from site-packages, and PYTHONPATH
+                # already points at the checkout
+                "-S",
                 "-c",
-                f"""
-import sys
-sys.path.insert(0, '{Path(__file__).parent.parent}')
-from pyqueue.broker.server import run_server
-from pyqueue.broker.config import BrokerConfig
-config = BrokerConfig(host='{self.host}', port={self.port}, data_dir='{self.data_dir}')
-run_server(config)
-""",
+                "from pyqueue.broker.server import run_server; "
+                "from pyqueue.broker.config import BrokerConfig; "
+                f"run_server(BrokerConfig(host={self.host!r}, port={self.port}, "
+                f"data_dir={self.data_dir!r}, "
+                f"preallocate_size={TEST_PREALLOCATE_SIZE}))",
             ],
             env=env,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
         )
 
-        if not wait_for_port(self.host, self.port):
-            self.stop()
-            raise RuntimeError("Broker failed to start")
-
     def stop(self) -> None:
         """Stop the broker process."""
-        if self.process:
-            self.process.send_signal(signal.SIGTERM)
+        if not self.process:
+            return
+
+        # A healthy broker exits promptly on SIGTERM; a hung one is killed
+        # rather than left to stall teardown
+        self.process.terminate()
+        exited_cleanly = True
+        if isinstance(self.process, subprocess.Popen):
             try:
-                self.process.wait(timeout=5)
+                self.process.wait(timeout=STOP_GRACE_PERIOD)
             except subprocess.TimeoutExpired:
+                exited_cleanly = False
+                self.process.kill()
+                self.process.wait(timeout=2)
+        else:
+            self.process.join(timeout=STOP_GRACE_PERIOD)
+            if self.process.is_alive():
+                exited_cleanly = False
                 self.process.kill()
-                self.process.wait()
-            self.process = None
+                self.process.join(timeout=2)
+            self.process.close()
+        self.process = None
 
-        wait_for_port_closed(self.host, self.port)
+        # A broker that exited on its own has released the port; only a
+        # killed one is given a moment for its socket to go away
+        if not exited_cleanly:
+            wait_for_port_closed(self.host, self.port, timeout=2)
 
     def restart(self) -> None:
         """Restart the broker (simulates crash recovery)."""
@@ -98,17 +233,56 @@ run_server(config)
         self.start()
 
 
+def broker_client(broker: BrokerProcess) -> PyQueueClient:
+    """Return a client for the broker.
+
+    Use it as a context manager: it connects on entry and is closed on exit
+    even when an assertion fails.
+    """
+    return PyQueueClient(host=broker.host, port=broker.port)
+
+
+def make_data_dir() -> str:
+    """Create a temporary data directory for a broker.
+
+    Uses a RAM-backed directory when one is writable so the brokers' syncs
+    and restarts never touch a real disk.
+    """
+    return tempfile.mkdtemp(prefix="pyqueue_test_", dir=RAM_TEMP_DIR)
+
+
 @pytest.fixture
 def temp_data_dir():
     """Create a temporary data directory for tests."""
-    data_dir = tempfile.mkdtemp(prefix="pyqueue_test_")
+    data_dir = make_data_dir()
     yield data_dir
     shutil.rmtree(data_dir, ignore_errors=True)
 
 
+@pytest.fixture(scope="module")
+def broker_session():
+    """Start one broker shared by all tests in the module."""
+    data_dir = make_data_dir()
+    broker = BrokerProcess(data_dir)
+    broker.start()
+    owner = os.getpid()
+    yield broker
+    # A forked test tears down module fixtures in its own process; only the
+    # process that started the shared broker may stop it
+    if os.getpid() == owner:
+        broker.stop()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
 @pytest.fixture
-def broker(temp_data_dir):
-    """Start a broker for testing."""
+def broker(broker_session):
+    """Provide the shared broker to a test."""
+    return broker_session
+
+
+@pytest.fixture
+def broker_fresh(temp_data_dir):
+    """Start a dedicated broker for tests that restart it."""
     broker = BrokerProcess(temp_data_dir)
     broker.start()
     yield broker
@@ -118,24 +292,57 @@ def broker(temp_data_dir):
 @pytest.fixture
 def client(broker):
     """Create a connected client."""
-    client = PyQueueClient(host=broker.host, port=broker.port)
-    client.connect()
-    yield client
-    client.close()
+    with broker_client(broker) as client:
+        yield client
+
 
+@pytest.fixture(scope="module")
+def raw_sock(broker_session):
+    """A raw connection to the shared broker, as a buffered file.
 
-class TestBrokerStartup:
-    """Tests for broker startup."""
+    Errors do not close the connection, so one socket serves every test
+    that sends malformed requests. Reads time out instead of hanging.
+    """
+    sock = socket.create_connection(
+        (broker_session.host, broker_session.port), timeout=5
+    )
+    with sock, sock.makefile("rwb") as conn:
+        yield conn
 
-    def test_broker_starts(self, broker):
-        """Test that the broker starts and accepts connections."""
-        assert wait_for_port(broker.host, broker.port)
 
-    def test_client_connects(self, broker):
-        """Test that a client can connect to the broker."""
-        client = PyQueueClient(host=broker.host, port=broker.port)
-        client.connect()
-        client.close()
+@pytest.fixture(scope="class")
+def class_client(broker_session):
+    """Create a connected client shared by the tests of one class.
+
+    Only for classes whose tests keep to their own consumer ids.
+    """
+    with broker_client(broker_session) as client:
+        yield client
+
+
+@pytest.fixture(scope="module")
+def control_client(broker_session):
+    """A connection used by fixtures to prepare the shared broker."""
+    with broker_client(broker_session) as client:
+        yield client
+
+
+@pytest.fixture
+def consumer(request, control_client):
+    """Return a factory for consumer ids private to the current test.
+
+    The shared broker's queue still holds messages from earlier tests, so
+    each id is prefixed with the test name and advanced to the end of the
+    queue before it is handed out. Create consumers before pushing.
+    """
+
+    def make(name: str) -> str:
+        consumer_id = f"{request.node.name}-{name}"
+        while control_client.pull_many(consumer_id, 100):
+            pass
+        return consumer_id
+
+    return make
 
 
 class TestPushPull:
@@ -146,191 +353,267 @@ class TestPushPull:
         result = client.push("test message")
         assert result is True
 
-    def test_pull_returns_message(self, client):
+    def test_pull_returns_message(self, client, consumer):
         """Test that pull returns the pushed message."""
+        consumer_id = consumer("test-consumer")
         client.push("hello world")
-        msg = client.pull("test-consumer")
+        msg = client.pull(consumer_id)
         assert msg == "hello world"
 
-    def test_pull_empty_returns_none(self, client):
+    def test_pull_empty_returns_none(self, client, consumer):
         """Test that pull returns None when queue is empty."""
-        msg = client.pull("new-consumer")
+        msg = client.pull(consumer("new-consumer"))
         assert msg is None
 
-    def test_push_message_with_spaces(self, client):
+    def test_push_message_with_spaces(self, client, consumer):
         """Test that messages with spaces work correctly."""
+        consumer_id = consumer("consumer")
         client.push("hello world with spaces")
-        msg = client.pull("consumer")
+        msg = client.pull(consumer_id)
         assert msg == "hello world with spaces"
 
+    def test_push_bytes(self, client, consumer):
+        """Test that raw bytes messages can be pushed and pulled."""
+        consumer_id = consumer("bytes-consumer")
+        assert client.push_bytes("bytes message ✓".encode("utf-8")) is True
+        msg = client.pull(consumer_id)
+        assert msg == "bytes message ✓"
+
+    def test_binary_round_trip(self, broker_fresh):
+        """Test that non-UTF-8 messages can be pulled back as bytes."""
+        # Undecodable messages would break str consumers of the shared broker
+        payload = b"\xff\xfe\x00binary"
+        with broker_client(broker_fresh) as client:
+            assert client.push_bytes(payload) is True
+            assert client.pull_bytes("binary-consumer") == payload
+            assert client.pull_bytes("binary-consumer") is None
+
+    def test_failed_pull_many_leaves_connection_usable(self, broker_fresh):
+        """Test that an undecodable message does not desync later replies."""
+        with broker_client(broker_fresh) as client:
+            client.push("a")
+            client.push_bytes(b"\xff\xfe")
+            client.push("b")
+            with pytest.raises(PyQueueError):
+                client.pull_many("desync-consumer", 3)
+
+            assert client.push("d") is True
+            assert client.pull("desync-consumer") == "d"
+
+    def test_pull_of_binary_message_raises_queue_error(self, broker_fresh):
+        """Test that pull reports undecodable messages as a PyQueueError."""
+        with broker_client(broker_fresh) as client:
+            client.push_bytes(b"\xff\xfe")
+            with pytest.raises(PyQueueError):
+                client.pull("undecodable-consumer")
+
 
 class TestMessageOrdering:
     """Tests for message ordering guarantees."""
 
-    def test_fifo_ordering(self, client):
+    def test_fifo_ordering(self, class_client, consumer):
         """Test that messages are delivered in FIFO order."""
+        consumer_id = consumer("order-consumer")
         messages = ["first", "second", "third", "fourth", "fifth"]
         for msg in messages:
-            client.push(msg)
+            class_client.push(msg)
 
         received = []
         for _ in range(len(messages)):
-            msg = client.pull("order-consumer")
+            msg = class_client.pull(consumer_id)
             received.append(msg)
 
         assert received == messages
 
-    def test_ordering_with_multiple_pushes(self, client):
+    def test_ordering_with_multiple_pushes(self, class_client, consumer):
         """Test ordering with many messages."""
-        count = 100
-        for i in range(count):
-            client.push(f"message-{i}")
-
-        for i in range(count):
-            msg = client.pull("bulk-consumer")
-            assert msg == f"message-{i}"
+        consumer_id = consumer("bulk-consumer")
+        messages = [f"message-{i}" for i in range(100)]
+        class_client.push_many(messages)
+
+        assert class_client.pull_many(consumer_id, len(messages)) == messages
+
+
+class TestPipelining:
+    """Tests for pipelined push_many/pull_many requests."""
+
+    def test_push_many_then_pull_many(self, client, consumer):
+        """Test that pipelined messages round-trip in order."""
+        consumer_id = consumer("pipeline-consumer")
+        messages = [f"pipelined-{i}" for i in range(50)]
+        client.push_many(messages)
+        assert client.pull_many(consumer_id, 50) == messages
+
+    def test_pull_many_stops_at_end_of_queue(self, client, consumer):
+        """Test that pull_many returns only the available messages."""
+        consumer_id = consumer("short-consumer")
+        client.push_many(["only-1", "only-2"])
+        assert client.pull_many(consumer_id, 5) == ["only-1", "only-2"]
+        assert client.pull(consumer_id) is None
+
+    def test_pull_sees_pipelined_pushes(self, broker, consumer):
+        """Test that a PULL after pipelined PUSHes sees those messages."""
+        consumer_id = consumer("visibility-consumer")
+        sock = socket.create_connection((broker.host, broker.port))
+        sock.sendall(f"PUSH first\nPUSH second\nPULL {consumer_id}\n".encode())
+        with sock.makefile("rb") as responses:
+            assert responses.readline() == b"OK\n"
+            assert responses.readline() == b"OK\n"
+            assert responses.readline() == b"MSG first\n"
+        sock.close()
 
 
 class TestMultipleConsumers:
     """Tests for multiple consumer support."""
 
-    def test_independent_offsets(self, client):
+    def test_independent_offsets(self, class_client, consumer):
         """Test that consumers have independent offsets."""
-        client.push("msg1")
-        client.push("msg2")
-        client.push("msg3")
+        consumer_a = consumer("consumer-a")
+        consumer_b = consumer("consumer-b")
+        class_client.push("msg1")
+        class_client.push("msg2")
+        class_client.push("msg3")
 
         # Consumer A reads all messages
-        assert client.pull("consumer-a") == "msg1"
-        assert client.pull("consumer-a") == "msg2"
-        assert client.pull("consumer-a") == "msg3"
-        assert client.pull("consumer-a") is None
+        assert class_client.pull(consumer_a) == "msg1"
+        assert class_client.pull(consumer_a) == "msg2"
+        assert class_client.pull(consumer_a) == "msg3"
+        assert class_client.pull(consumer_a) is None
 
         # Consumer B should still see all messages
-        assert client.pull("consumer-b") == "msg1"
-        assert client.pull("consumer-b") == "msg2"
-        assert client.pull("consumer-b") == "msg3"
-        assert client.pull("consumer-b") is None
+        assert class_client.pull(consumer_b) == "msg1"
+        assert class_client.pull(consumer_b) == "msg2"
+        assert class_client.pull(consumer_b) == "msg3"
+        assert class_client.pull(consumer_b) is None
 
-    def test_consumer_resumes_from_offset(self, client):
+    def test_consumer_resumes_from_offset(self, class_client, consumer):
         """Test that a consumer resumes from their last offset."""
-        client.push("msg1")
-        client.push("msg2")
-        client.push("msg3")
+        consumer_id = consumer("resuming-consumer")
+        class_client.push("msg1")
+        class_client.push("msg2")
+        class_client.push("msg3")
 
         # Consumer reads first two messages
-        assert client.pull("resuming-consumer") == "msg1"
-        assert client.pull("resuming-consumer") == "msg2"
+        assert class_client.pull(consumer_id) == "msg1"
+        assert class_client.pull(consumer_id) == "msg2"
 
         # Add more messages
-        client.push("msg4")
-        client.push("msg5")
+        class_client.push("msg4")
+        class_client.push("msg5")
 
         # Consumer should resume from msg3
-        assert client.pull("resuming-consumer") == "msg3"
-        assert client.pull("resuming-consumer") == "msg4"
-        assert client.pull("resuming-consumer") == "msg5"
+        assert class_client.pull(consumer_id) == "msg3"
+        assert class_client.pull(consumer_id) == "msg4"
+        assert class_client.pull(consumer_id) == "msg5"
 
 
+@forked
 class TestPersistence:
     """Tests for persistence across broker restarts."""
 
-    def test_messages_persist_after_restart(self, broker, temp_data_dir):
+    def test_messages_persist_after_restart(self, broker_fresh):
         """Test that messages persist after broker restart."""
+        broker = broker_fresh
         # Push messages
-        client = PyQueueClient(host=broker.host, port=broker.port)
-        client.connect()
-        client.push("persistent-1")
-        client.push("persistent-2")
-        client.push("persistent-3")
-        client.close()
+        with broker_client(broker) as client:
+            client.push("persistent-1")
+            client.push("persistent-2")
+            client.push("persistent-3")
 
         # Restart broker
         broker.restart()
 
         # Verify messages are still there
-        client = PyQueueClient(host=broker.host, port=broker.port)
-        client.connect()
-        assert client.pull("recovery-consumer") == "persistent-1"
-        assert client.pull("recovery-consumer") == "persistent-2"
-        assert client.pull("recovery-consumer") == "persistent-3"
-        assert client.pull("recovery-consumer") is None
-        client.close()
-
-    def test_consumer_offsets_persist_after_restart(self, broker, temp_data_dir):
+        with broker_client(broker) as client:
+            assert client.pull("recovery-consumer") == "persistent-1"
+            assert client.pull("recovery-consumer") == "persistent-2"
+            assert client.pull("recovery-consumer") == "persistent-3"
+            assert client.pull("recovery-consumer") is None
+
+    def test_consumer_offsets_persist_after_restart(self, broker_fresh):
         """Test that consumer offsets persist after broker restart."""
+        broker = broker_fresh
         # Push messages and consume some
-        client = PyQueueClient(host=broker.host, port=broker.port)
-        client.connect()
-        client.push("offset-1")
-        client.push("offset-2")
-        client.push("offset-3")
-        assert client.pull("offset-consumer") == "offset-1"
-        assert client.pull("offset-consumer") == "offset-2"
-        client.close()
+        with broker_client(broker) as client:
+            client.push("offset-1")
+            client.push("offset-2")
+            client.push("offset-3")
+            assert client.pull("offset-consumer") == "offset-1"
+            assert client.pull("offset-consumer") == "offset-2"
 
         # Restart broker
         broker.restart()
 
         # Consumer should resume from offset 2 (after msg2)
-        client = PyQueueClient(host=broker.host, port=broker.port)
-        client.connect()
-        assert client.pull("offset-consumer") == "offset-3"
-        assert client.pull("offset-consumer") is None
-        client.close()
+        with broker_client(broker) as client:
+            assert client.pull("offset-consumer") == "offset-3"
+            assert client.pull("offset-consumer") is None
 
 
 class TestErrorHandling:
     """Tests for error handling."""
 
-    def test_push_without_message_fails(self, broker):
+    def test_push_without_message_fails(self, raw_sock):
         """Test that PUSH without a message returns an error."""
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.connect((broker.host, broker.port))
-        sock.sendall(b"PUSH\n")
-        response = sock.recv(1024).decode()
-        sock.close()
-        assert response.startswith("ERR")
+        raw_sock.write(b"PUSH\n")
+        raw_sock.flush()
+        assert raw_sock.readline().startswith(b"ERR")
 
-    def test_unknown_command_fails(self, broker):
+    def test_unknown_command_fails(self, raw_sock):
         """Test that unknown commands return an error."""
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.connect((broker.host, broker.port))
-        sock.sendall(b"INVALID command\n")
-        response = sock.recv(1024).decode()
-        sock.close()
-        assert response.startswith("ERR")
+        raw_sock.write(b"INVALID command\n")
+        raw_sock.flush()
+        assert raw_sock.readline().startswith(b"ERR")
 
     def test_message_with_newline_rejected(self, client):
         """Test that messages with newlines are rejected."""
         with pytest.raises(ValueError):
             client.push("message\nwith\nnewlines")
 
+    def test_bytes_message_with_newline_rejected(self, client):
+        """Test that bytes messages with newlines are rejected."""
+        with pytest.raises(ValueError):
+            client.push_bytes(b"message\nwith\nnewlines")
+
 
 class TestConcurrency:
     """Tests for concurrent client handling."""
 
-    def test_multiple_clients(self, broker):
+    def test_multiple_clients(self, broker, consumer):
         """Test that multiple clients can connect simultaneously."""
-        clients = []
-        for i in range(5):
-            client = PyQueueClient(host=broker.host, port=broker.port)
-            client.connect()
-            clients.append(client)
+        consumer_id = consumer("multi-client-consumer")
+        client_count = 5
+        payloads = [f"client-{i}-message" for i in range(client_count)]
 
-        # Each client pushes a message
-        for i, client in enumerate(clients):
-            client.push(f"client-{i}-message")
-
-        # First client reads all messages
-        messages = []
-        while True:
-            msg = clients[0].pull("multi-client-consumer")
-            if msg is None:
-                break
-            messages.append(msg)
+        def connect() -> PyQueueClient:
+            client = broker_client(broker)
+            client.connect()
+            return client
 
-        assert len(messages) == 5
+        def push(job) -> bool:
+            client, payload = job
+            return client.push(payload)
 
-        for client in clients:
-            client.close()
+        with ThreadPoolExecutor(max_workers=client_count) as executor:
+            connecting = [executor.submit(connect) for _ in range(client_count)]
+            try:
+                clients = [future.result() for future in connecting]
+
+                # Each client pushes a message, all at once
+                assert all(executor.map(push, zip(clients, payloads)))
+
+                # First client reads all messages
+                messages = []
+                while True:
+                    msg = clients[0].pull(consumer_id)
+                    if msg is None:
+                        break
+                    messages.append(msg)
+            finally:
+                # Close every client that connected, even if another failed
+                for future in connecting:
+                    if future.exception() is None:
+                        future.result().close()
+
+        assert len(messages) == client_count
+        assert sorted(messages) == sorted(payloads)
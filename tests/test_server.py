@@ -0,0 +1,86 @@
+"""Tests for the broker server running in-process."""
+
+import asyncio
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from pyqueue.broker.config import BrokerConfig
+from pyqueue.broker.handlers import CommandHandler
+from pyqueue.broker.protocol import Command, OK_BYTES, ParsedCommand
+from pyqueue.broker.server import PyQueueServer
+from pyqueue.storage.queue import PersistentQueue
+
+
+@pytest.fixture
+def temp_data_dir():
+    """Create a temporary data directory for tests."""
+    data_dir = tempfile.mkdtemp(prefix="pyqueue_test_")
+    yield data_dir
+    shutil.rmtree(data_dir, ignore_errors=True)
+
+
+class TestCommandHandler:
+    """Tests for commands handled outside the batched PUSH path."""
+
+    def test_push_is_synced_before_ok(self, temp_data_dir, monkeypatch):
+        """Test that a PUSH through the handler is written as a synced batch."""
+        queue = PersistentQueue(temp_data_dir)
+        batches = []
+        append_batch = queue._log.append_batch
+
+        def recording_append_batch(records):
+            batches.append(list(records))
+            return append_batch(records)
+
+        monkeypatch.setattr(queue._log, "append_batch", recording_append_batch)
+        handler = CommandHandler(queue)
+
+        assert handler.handle(ParsedCommand(Command.PUSH, [b"direct"])) == [OK_BYTES]
+        assert batches == [[b"direct"]]
+        queue.close()
+
+
+class TestShutdown:
+    """Tests for stopping the broker while PUSHes are in flight."""
+
+    def test_batch_written_during_stop_is_acknowledged(self, temp_data_dir):
+        """Test that a batch on disk by the time stop() returns is reported OK."""
+        server = PyQueueServer(BrokerConfig(port=0, data_dir=temp_data_dir))
+        push_batch = server._queue.push_batch
+
+        def slow_push_batch(messages):
+            time.sleep(0.2)
+            return push_batch(messages)
+
+        server._queue.push_batch = slow_push_batch
+
+        async def scenario():
+            serving = asyncio.create_task(server.start())
+            while server._server is None or not server._server.is_serving():
+                await asyncio.sleep(0.01)
+            port = server._server.sockets[0].getsockname()[1]
+
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"PUSH in-flight\n")
+            await writer.drain()
+            await asyncio.sleep(0.05)  # Let the batch reach the worker thread
+
+            await server.stop()
+            serving.cancel()
+            reply = await reader.readline()
+            writer.close()
+            return reply
+
+        assert asyncio.run(scenario()) == b"OK\n"
+
+        queue = PersistentQueue(temp_data_dir)
+        assert queue.pull("consumer") == b"in-flight"
+        queue.close()
@@ -0,0 +1,374 @@
+"""Unit tests for the PyQueue storage layer."""
+
+import json
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from pyqueue.storage.log import AppendLog
+from pyqueue.storage.offsets import OffsetStore
+from pyqueue.storage.queue import PersistentQueue
+from pyqueue.storage.rwlock import RWLock
+
+
+# Keeps preallocated space small so log tests do not reserve 64 MB each
+PREALLOCATE_SIZE = 64 * 1024
+
+
+def wait_until(predicate, timeout: float = 5.0) -> None:
+    """Wait for a condition set by another thread."""
+    deadline = time.time() + timeout
+    while not predicate():
+        if time.time() > deadline:
+            raise AssertionError("Condition not reached")
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def temp_data_dir():
+    """Create a temporary data directory for tests."""
+    data_dir = tempfile.mkdtemp(prefix="pyqueue_test_")
+    yield data_dir
+    shutil.rmtree(data_dir, ignore_errors=True)
+
+
+class TestRWLock:
+    """Tests for the readers-writer lock."""
+
+    def test_readers_share_the_lock(self):
+        """Test that several readers hold the lock at the same time."""
+        lock = RWLock()
+        # Each reader waits inside the lock for the other; this only
+        # completes if both are holding it together
+        barrier = threading.Barrier(2, timeout=5)
+        errors = []
+
+        def read():
+            try:
+                with lock.read_locked():
+                    barrier.wait()
+            except threading.BrokenBarrierError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=read) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+
+    def test_writer_excludes_readers(self):
+        """Test that a reader waits while a writer holds the lock."""
+        lock = RWLock()
+        acquired = threading.Event()
+
+        def read():
+            with lock.read_locked():
+                acquired.set()
+
+        with lock.write_locked():
+            reader = threading.Thread(target=read)
+            reader.start()
+            assert not acquired.wait(0.05)
+
+        reader.join()
+        assert acquired.is_set()
+
+    def test_waiting_writer_blocks_new_readers(self):
+        """Test that a waiting writer is served before readers that arrive later."""
+        lock = RWLock()
+        order = []
+
+        def write():
+            with lock.write_locked():
+                order.append("writer")
+
+        def read():
+            with lock.read_locked():
+                order.append("reader")
+
+        with lock.read_locked():
+            writer = threading.Thread(target=write)
+            writer.start()
+            wait_until(lambda: lock._writers_waiting == 1)
+
+            reader = threading.Thread(target=read)
+            reader.start()
+            time.sleep(0.05)
+            # Neither may proceed while the first reader holds the lock
+            assert order == []
+
+        writer.join()
+        reader.join()
+        assert order == ["writer", "reader"]
+
+
+class TestAppendLog:
+    """Tests for the append-only message log."""
+
+    def test_reopen_truncates_torn_tail(self, temp_data_dir):
+        """Test that a partially written record is dropped on reopen."""
+        path = os.path.join(temp_data_dir, "queue.log")
+        log = AppendLog(path, preallocate_size=PREALLOCATE_SIZE)
+        log.append_batch([b"first", b"second"])
+        log.close()
+        intact_size = os.path.getsize(path)
+
+        # Header promising 100 bytes followed by only 10
+        with open(path, "ab") as f:
+            f.write(struct.pack(">I", 100) + b"x" * 10)
+
+        log = AppendLog(path, preallocate_size=PREALLOCATE_SIZE)
+        assert os.path.getsize(path) == intact_size
+        assert [data for _, _, data in log.replay()] == [b"first", b"second"]
+
+        # New records go straight after the last complete one
+        assert log.append(b"third") == (intact_size, 5)
+        assert log.read_at(intact_size) == b"third"
+        log.close()
+
+    @pytest.mark.skipif(
+        not hasattr(os, "posix_fallocate"), reason="requires posix_fallocate"
+    )
+    def test_close_trims_preallocated_space(self, temp_data_dir):
+        """Test that preallocation grows the file and close trims it back."""
+        path = os.path.join(temp_data_dir, "queue.log")
+        log = AppendLog(path, preallocate_size=PREALLOCATE_SIZE)
+        log.append(b"message")
+        size = log.size
+        assert os.path.getsize(path) >= PREALLOCATE_SIZE
+        log.close()
+
+        assert os.path.getsize(path) == size
+
+    def test_reopen_after_unclean_shutdown(self, temp_data_dir):
+        """Test that a zero-filled preallocated tail marks the end of the log."""
+        path = os.path.join(temp_data_dir, "queue.log")
+        log = AppendLog(path, preallocate_size=PREALLOCATE_SIZE)
+        entries = log.append_batch([b"one", b"two"])
+        log.close()
+        size = os.path.getsize(path)
+        # What a crash leaves behind: records followed by untrimmed zeros
+        os.truncate(path, size + PREALLOCATE_SIZE)
+
+        log = AppendLog(path, preallocate_size=PREALLOCATE_SIZE)
+        assert list(log.scan()) == entries
+        assert os.path.getsize(path) == size
+        assert log.size == size
+        log.close()
+
+    def test_reopen_keeps_legacy_empty_records(self, temp_data_dir):
+        """Test that empty records written by older versions do not end the log."""
+        path = os.path.join(temp_data_dir, "queue.log")
+        records = [b"one", b"", b"two", b"three"]
+        with open(path, "wb") as f:
+            for data in records:
+                f.write(struct.pack(">I", len(data)) + data)
+        size = os.path.getsize(path)
+
+        log = AppendLog(path, preallocate_size=PREALLOCATE_SIZE)
+        assert os.path.getsize(path) == size
+        assert [data for _, _, data in log.replay()] == records
+        log.close()
+
+    def test_empty_record_rejected(self, temp_data_dir):
+        """Test that empty records, which would read as end of log, are refused."""
+        log = AppendLog(
+            os.path.join(temp_data_dir, "queue.log"), preallocate_size=PREALLOCATE_SIZE
+        )
+        with pytest.raises(ValueError):
+            log.append(b"")
+        with pytest.raises(ValueError):
+            log.append_batch([b"ok", b""])
+        log.close()
+
+
+class TestOffsetStore:
+    """Tests for the consumer offset log."""
+
+    def test_offsets_survive_reopen(self, temp_data_dir):
+        """Test that the last saved offset of each consumer is recovered."""
+        path = os.path.join(temp_data_dir, "offsets.log")
+        store = OffsetStore(path)
+        store.set("a", 1)
+        store.save()
+        store.set("a", 5)
+        store.set("b", 2)
+        store.close()
+
+        assert OffsetStore(path).all_offsets() == {"a": 5, "b": 2}
+
+    def test_migrates_legacy_json(self, temp_data_dir):
+        """Test that offsets are carried over from a legacy offsets.json."""
+        path = os.path.join(temp_data_dir, "offsets.log")
+        legacy_path = os.path.join(temp_data_dir, "offsets.json")
+        with open(legacy_path, "w") as f:
+            json.dump({"a": 3, "b": 7}, f)
+
+        store = OffsetStore(path, legacy_path=legacy_path)
+        assert store.all_offsets() == {"a": 3, "b": 7}
+        store.close()
+
+        # The migrated offsets now live in the log itself
+        assert OffsetStore(path).all_offsets() == {"a": 3, "b": 7}
+
+    def test_log_takes_precedence_over_legacy_json(self, temp_data_dir):
+        """Test that a stale offsets.json is ignored once the log exists."""
+        path = os.path.join(temp_data_dir, "offsets.log")
+        legacy_path = os.path.join(temp_data_dir, "offsets.json")
+        store = OffsetStore(path)
+        store.set("a", 9)
+        store.close()
+        with open(legacy_path, "w") as f:
+            json.dump({"a": 3}, f)
+
+        assert OffsetStore(path, legacy_path=legacy_path).get("a") == 9
+
+    def test_recovers_from_torn_trailing_record(self, temp_data_dir):
+        """Test that a partially written last record is dropped on load."""
+        path = os.path.join(temp_data_dir, "offsets.log")
+        store = OffsetStore(path)
+        store.set("a", 4)
+        store.close()
+        intact_size = os.path.getsize(path)
+
+        with open(path, "ab") as f:
+            f.write(store._encode("a", 8)[:-3])
+
+        store = OffsetStore(path)
+        assert store.get("a") == 4
+        assert os.path.getsize(path) == intact_size
+
+        # Records appended after recovery stay aligned
+        store.set("a", 6)
+        store.close()
+        assert OffsetStore(path).get("a") == 6
+
+    def test_compaction_keeps_one_record_per_consumer(self, temp_data_dir, monkeypatch):
+        """Test that compaction rewrites the log without losing offsets."""
+        monkeypatch.setattr(OffsetStore, "COMPACT_MIN_SIZE", 0)
+        path = os.path.join(temp_data_dir, "offsets.log")
+        store = OffsetStore(path)
+        for offset in range(1, 20):
+            store.set("a", offset)
+            store.set("b", offset * 2)
+            store.save()
+        store.close()
+
+        snapshot_size = len(store._encode("a", 19)) + len(store._encode("b", 38))
+        assert os.path.getsize(path) <= OffsetStore.COMPACT_RATIO * snapshot_size
+        assert OffsetStore(path).all_offsets() == {"a": 19, "b": 38}
+
+
+class TestPersistentQueue:
+    """Tests for the persistent queue."""
+
+    def test_index_recovered_on_reopen(self, temp_data_dir):
+        """Test that reopening a queue rebuilds its index from the log."""
+        queue = PersistentQueue(temp_data_dir)
+        queue.push_batch(["a", "bb", "ccc"])
+        queue.close()
+
+        queue = PersistentQueue(temp_data_dir)
+        assert queue.message_count() == 3
+        assert [queue.pull("consumer") for _ in range(4)] == [b"a", b"bb", b"ccc", None]
+        queue.close()
+
+    def test_offsets_written_outside_offsets_lock(self, temp_data_dir, monkeypatch):
+        """Test that flushing offsets does file I/O without blocking pulls."""
+        queue = PersistentQueue(temp_data_dir)
+        queue.push("message")
+        queue.pull("consumer")
+
+        held = []
+        write = queue._offsets.write
+
+        def checked_write(pending):
+            held.append(queue._offsets_lock.locked())
+            write(pending)
+
+        monkeypatch.setattr(queue._offsets, "write", checked_write)
+        queue.flush_offsets()
+        assert held == [False]
+        queue.close()
+
+        reopened = PersistentQueue(temp_data_dir)
+        assert reopened.consumer_offset("consumer") == 1
+        reopened.close()
+
+    def test_empty_pulls_do_not_register_consumers(self, temp_data_dir):
+        """Test that pulling nothing leaves no offset behind for the consumer."""
+        queue = PersistentQueue(temp_data_dir)
+        for i in range(100):
+            assert queue.pull(f"consumer-{i}") is None
+        assert queue._offsets.all_offsets() == {}
+        queue.close()
+
+        reopened = PersistentQueue(temp_data_dir)
+        assert reopened._offsets.all_offsets() == {}
+        reopened.close()
+
+    def test_pulls_read_payloads_concurrently(self, temp_data_dir, monkeypatch):
+        """Test that payload reads do not hold the consumer offsets lock."""
+        queue = PersistentQueue(temp_data_dir)
+        queue.push("shared")
+        # Each read waits inside read_exact for the other; this only
+        # completes if the two pulls are reading at the same time
+        barrier = threading.Barrier(2, timeout=5)
+        read_exact = queue._log.read_exact
+
+        def read_together(offset, length):
+            barrier.wait()
+            return read_exact(offset, length)
+
+        monkeypatch.setattr(queue._log, "read_exact", read_together)
+        results = []
+        threads = [
+            threading.Thread(target=lambda i=i: results.append(queue.pull(f"c{i}")))
+            for i in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == [b"shared", b"shared"]
+        queue.close()
+
+    def test_failed_read_rewinds_offset(self, temp_data_dir, monkeypatch):
+        """Test that a message whose read fails is delivered again."""
+        queue = PersistentQueue(temp_data_dir)
+        queue.push("only")
+
+        def fail(offset, length):
+            raise OSError("read failed")
+
+        with monkeypatch.context() as patch:
+            patch.setattr(queue._log, "read_exact", fail)
+            with pytest.raises(OSError):
+                queue.pull("consumer")
+
+        assert queue.consumer_offset("consumer") == 0
+        assert queue.pull("consumer") == b"only"
+        queue.close()
+
+    def test_pull_after_close_fails_cleanly(self, temp_data_dir):
+        """Test that pulling from a closed queue raises instead of reading."""
+        queue = PersistentQueue(temp_data_dir)
+        queue.push("message")
+        queue.close()
+
+        with pytest.raises(ValueError):
+            queue.pull("consumer")
+        assert queue.consumer_offset("consumer") == 0